@@ -68,6 +68,9 @@ module "transcribe_lambda" {
   environment_variables = {
     TRANSCRIPTION_OUTPUT_BUCKET = module.transcription_bucket.bucket_id
     TRANSCRIBE_REGION           = "us-east-1"
+    # The e2e test uploads the same sample every run; keep the result cache off so
+    # every run goes through AWS Transcribe
+    TRANSCRIBE_CACHE            = "0"
   }
   
   s3_bucket_arns = [
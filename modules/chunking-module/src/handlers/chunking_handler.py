@@ -1,3 +1,4 @@
+import gzip
 import json
 import logging
 import os
@@ -108,7 +109,11 @@ def get_s3_object(bucket: str, key: str) -> Dict[str, Any]:
     
     try:
         response = s3_client.get_object(Bucket=bucket, Key=key)
-        return json.loads(response['Body'].read().decode('utf-8'))
+        content = response['Body'].read()
+        # The transcription module stores its results gzip-compressed
+        if response.get('ContentEncoding') == 'gzip':
+            content = gzip.decompress(content)
+        return json.loads(content)
     except ClientError as e:
         if e.response['Error']['Code'] == 'NoSuchKey':
             raise ValueError(f"File {key} not found in bucket {bucket}")
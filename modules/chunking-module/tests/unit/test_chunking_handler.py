@@ -1,3 +1,4 @@
+import gzip
 import json
 import pytest
 from botocore.exceptions import ClientError
@@ -108,6 +109,18 @@ def test_get_s3_object_success(mocker, mock_s3_response, sample_transcription_re
     result = get_s3_object("test-bucket", "test-key")
     assert result == sample_transcription_result
 
+def test_get_s3_object_gzip(mocker, sample_transcription_result):
+    """Test retrieval of a gzip-encoded S3 object."""
+    class MockBody:
+        def read(self):
+            return gzip.compress(json.dumps(sample_transcription_result).encode())
+    
+    mock_s3 = mocker.patch("boto3.client")
+    mock_s3.return_value.get_object.return_value = {'Body': MockBody(), 'ContentEncoding': 'gzip'}
+    
+    result = get_s3_object("test-bucket", "test-key.json.gz")
+    assert result == sample_transcription_result
+
 def test_get_s3_object_not_found(mocker):
     """Test S3 object not found."""
     mock_s3 = mocker.patch("boto3.client")
@@ -2,7 +2,7 @@ import json
 import logging
 import os
 from services.transcription_service import TranscriptionService
-from utils.s3_utils import S3Utils
+from utils.s3_utils import S3Utils, etag_from_head
 from utils.error_handler import handle_error
 from utils.metadata_utils import sanitize_metadata
 
@@ -10,6 +10,10 @@ from utils.metadata_utils import sanitize_metadata
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Time kept back from the Lambda's remaining time for saving the result and returning,
+# so a Transcribe job that runs too long fails with a timeout error instead of being killed
+_TIMEOUT_MARGIN_SECONDS = 20
+
 def lambda_handler(event, context):
     """
     Main entry point for the transcription Lambda function.
@@ -22,7 +26,9 @@ def lambda_handler(event, context):
         dict: Response containing success/failure information
     """
     try:
-        logger.info(f"Received event: {json.dumps(event)}")
+        # Only serialize the event when the record will actually be emitted
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Received event: %s", json.dumps(event, separators=(',', ':')))
         
         # Extract records from either EventBridge or S3 event format
         records = []
@@ -63,28 +69,33 @@ def lambda_handler(event, context):
                 'body': json.dumps('Missing bucket or key information')
             }
             
-        logger.info(f"Processing file {key} from bucket {bucket}")
+        logger.info("Processing file %s from bucket %s", key, bucket)
         
         # Initialize services
         s3_utils = S3Utils()
-        transcription_service = TranscriptionService()
+        transcription_service = TranscriptionService(s3_utils=s3_utils)
         
-        # Get metadata from S3 object and sanitize it
-        raw_metadata = s3_utils.get_object_metadata(bucket, key)
+        # Get metadata from S3 object and sanitize it; the same headers carry the
+        # ETag that keys the transcription cache
+        head = s3_utils.head_object(bucket, key)
+        raw_metadata = head.get('Metadata', {})
         metadata = sanitize_metadata(raw_metadata)
         
         # Log both raw and sanitized metadata for debugging
-        logger.info(f"Raw metadata for {key}: {metadata}")
+        logger.info("Raw metadata for %s: %s", key, metadata)
         logger.info(
-            f"Sanitized metadata for {key}: "
-            f"Speaker: {metadata.get('speaker', 'Not specified')}, "
-            f"Title: {metadata.get('title', 'Not specified')}, "
-            f"Track: {metadata.get('track', 'Not specified')}, "
-            f"Day: {metadata.get('day', 'Not specified')}"
+            "Sanitized metadata for %s: Speaker: %s, Title: %s, Track: %s, Day: %s",
+            key,
+            metadata.get('speaker', 'Not specified'),
+            metadata.get('title', 'Not specified'),
+            metadata.get('track', 'Not specified'),
+            metadata.get('day', 'Not specified')
         )
         
         # Process the media file (audio or video)
-        output_key = transcription_service.process_media(bucket, key)
+        output_key = transcription_service.process_media(
+            bucket, key, etag=etag_from_head(head), wait_timeout_seconds=_wait_timeout(context)
+        )
         
         # Prepare response in EventBridge format
         output_bucket = os.environ.get('TRANSCRIPTION_OUTPUT_BUCKET')
@@ -111,4 +122,21 @@ def lambda_handler(event, context):
         return response
     
     except Exception as e:
-        return handle_error(e, "Error processing transcription request") 
\ No newline at end of file
+        return handle_error(e, "Error processing transcription request")
+
+
+def _wait_timeout(context):
+    """
+    Work out how long to wait for the Transcribe job from the Lambda's remaining time
+    
+    Args:
+        context: AWS Lambda context object
+        
+    Returns:
+        float: Seconds to wait, or None to use the service default when the remaining
+        time is unknown (e.g. when invoked outside Lambda)
+    """
+    get_remaining_time = getattr(context, 'get_remaining_time_in_millis', None)
+    if get_remaining_time is None:
+        return None
+    return max(0, get_remaining_time() / 1000 - _TIMEOUT_MARGIN_SECONDS)
@@ -1,6 +1,12 @@
 class TranscriptionResult:
     """Data model for transcription results"""
     
+    # No per-instance __dict__; batch processing creates one result per file
+    __slots__ = (
+        'original_file', 'transcription_text', 'timestamp', 'job_name',
+        'media_type', 'segments', 'audio_segments'
+    )
+    
     def __init__(self, original_file, transcription_text, timestamp, job_name=None, media_type='audio', segments=None, audio_segments=None):
         """
         Initialize a new transcription result
@@ -1,21 +1,66 @@
-import json
 import logging
 import os
-import tempfile
 import boto3
 import uuid
 import time
 from abc import ABC, abstractmethod
+from botocore.exceptions import BotoCoreError, ClientError
 from models.transcription_result import TranscriptionResult
+from utils.aws_config import BOTO_CONFIG
 from utils.s3_utils import S3Utils
 
 logger = logging.getLogger()
 
+# Language of the transcribed media; also part of the result cache key
+_LANGUAGE_CODE = 'en-US'
+
+# Default limit for waiting on a Transcribe job; kept well below the 300 s Lambda
+# timeout so the timeout error is raised before Lambda kills the invocation
+_WAIT_TIMEOUT_SECONDS = 240
+
+# Word-level item types kept from the AWS Transcribe output
+_SEGMENT_TYPES = frozenset(('pronunciation', 'punctuation'))
+
+# File extension -> (media type, AWS Transcribe MediaFormat)
+_MEDIA_FORMATS = {
+    'mp3': ('audio', 'mp3'),
+    'wav': ('audio', 'wav'),
+    'wave': ('audio', 'wav'),
+    'flac': ('audio', 'flac'),
+    'ogg': ('audio', 'ogg'),
+    'amr': ('audio', 'amr'),
+    'mp4': ('video', 'mp4'),
+    'avi': ('video', 'avi'),
+    'mov': ('video', 'mov'),
+    'mkv': ('video', 'mkv'),
+    'webm': ('video', 'webm')
+}
+
+def _split_key(key):
+    """
+    Split an S3 object key into the file name stem and extension
+    
+    S3 keys always use '/' as the separator, so this avoids the generic os.path machinery.
+    
+    Args:
+        key (str): S3 object key, e.g. 'audio/talk.mp3'
+        
+    Returns:
+        tuple: (stem, extension) without the dot, e.g. ('talk', 'mp3');
+            the extension is empty when the file name has none
+    """
+    base = key.rpartition('/')[2]
+    stem, dot, extension = base.rpartition('.')
+    # Like os.path.splitext, a name without a dot or with only a leading dot has no extension
+    if not stem.strip('.'):
+        return base, ''
+    return stem, extension
+
 class TranscriptionStrategy(ABC):
     """Abstract base class for transcription strategies"""
     
     @abstractmethod
-    def process_transcription(self, job_name, output_bucket, s3_utils):
+    def process_transcription(self, job_name, output_bucket, s3_utils, include_segments=True):
         """
         Process a completed transcription job and extract results
         
@@ -23,6 +68,7 @@ class TranscriptionStrategy(ABC):
             job_name (str): The transcription job name
             output_bucket (str): The S3 bucket containing transcription output
             s3_utils (S3Utils): Utility for S3 operations
+            include_segments (bool, optional): Whether to extract word-level segments
             
         Returns:
             tuple: (transcription_text, word_segments, audio_segments)
@@ -32,7 +78,7 @@ class TranscriptionStrategy(ABC):
 class AWSTranscribeStrategy(TranscriptionStrategy):
     """Strategy for processing AWS Transcribe output"""
     
-    def process_transcription(self, job_name, output_bucket, s3_utils):
+    def process_transcription(self, job_name, output_bucket, s3_utils, include_segments=True):
         """
         Process AWS Transcribe output and extract transcription data
         
@@ -40,11 +86,13 @@ class AWSTranscribeStrategy(TranscriptionStrategy):
             job_name (str): The AWS Transcribe job name
             output_bucket (str): The S3 bucket containing transcription output
             s3_utils (S3Utils): Utility for S3 operations
+            include_segments (bool, optional): Whether to extract word-level segments; the
+                per-item work dominates for long media and not every consumer needs it
             
         Returns:
             tuple: (transcription_text, word_segments, audio_segments)
         """
-        logger.info(f"Processing transcription results for job {job_name}")
+        logger.info("Processing transcription results for job %s", job_name)
         
         # Get transcript from the output file
         transcript_file_key = f"raw_transcriptions/{job_name}.json"
@@ -54,8 +102,8 @@ class AWSTranscribeStrategy(TranscriptionStrategy):
         results = transcript_json.get('results', {})
         transcription_text = results.get('transcripts', [{}])[0].get('transcript', '')
         
-        # Extract word-level segments (items) with timestamps
-        segments = results.get('items', [])
+        # Extract word-level segments (items) with timestamps, unless they are not wanted
+        segments = results.get('items', []) if include_segments else []
         
         # Extract sentence-level audio segments if available
         audio_segments = results.get('audio_segments', [])
@@ -63,39 +111,43 @@ class AWSTranscribeStrategy(TranscriptionStrategy):
         # Process word-level segments if exists
         processed_segments = []
         if segments:
-            logger.info(f"Extracted {len(segments)} word-level segments from transcription")
+            logger.info("Extracted %s word-level segments from transcription", len(segments))
             
-            # We're only keeping the essential information from each segment
-            for segment in segments:
-                if segment.get('type') in ['pronunciation', 'punctuation']:
-                    processed_segment = {
-                        'type': segment.get('type'),
-                        'content': segment.get('alternatives', [{}])[0].get('content', ''),
-                        'start_time': segment.get('start_time'),
-                        'end_time': segment.get('end_time'),
-                        'confidence': segment.get('alternatives', [{}])[0].get('confidence', '0')
-                    }
-                    processed_segments.append(processed_segment)
+            # We're only keeping the essential information from each segment,
+            # reading each segment's first alternative only once
+            processed_segments = [
+                {
+                    'type': segment_type,
+                    'content': alternative.get('content', ''),
+                    'start_time': segment.get('start_time'),
+                    'end_time': segment.get('end_time'),
+                    'confidence': alternative.get('confidence', '0')
+                }
+                for segment in segments
+                if (segment_type := segment.get('type')) in _SEGMENT_TYPES
+                for alternative in ((segment.get('alternatives') or [{}])[0],)
+            ]
             
-            logger.info(f"Processed {len(processed_segments)} word-level segments")
+            logger.info("Processed %s word-level segments", len(processed_segments))
         
         # Process sentence-level audio segments if exists
         processed_audio_segments = []
         if audio_segments:
-            logger.info(f"Extracted {len(audio_segments)} sentence-level audio segments from transcription")
+            logger.info("Extracted %s sentence-level audio segments from transcription", len(audio_segments))
             
             # Process each sentence-level segment
-            for segment in audio_segments:
-                processed_audio_segment = {
+            processed_audio_segments = [
+                {
                     'id': segment.get('id'),
                     'transcript': segment.get('transcript', ''),
                     'start_time': segment.get('start_time'),
                     'end_time': segment.get('end_time'),
                     'items': segment.get('items', [])
                 }
-                processed_audio_segments.append(processed_audio_segment)
+                for segment in audio_segments
+            ]
             
-            logger.info(f"Processed {len(processed_audio_segments)} sentence-level audio segments")
+            logger.info("Processed %s sentence-level audio segments", len(processed_audio_segments))
         
         # Return both transcription text and processed segments
         return transcription_text, processed_segments, processed_audio_segments
@@ -118,20 +170,56 @@ class TranscriptionStrategyFactory:
         if provider.lower() == 'aws':
             return AWSTranscribeStrategy()
         else:
-            logger.warning(f"Unknown provider '{provider}', defaulting to AWS")
+            logger.warning("Unknown provider '%s', defaulting to AWS", provider)
             return AWSTranscribeStrategy()
 
 
 class TranscriptionService:
     """Service to handle audio and video transcription logic using AWS Transcribe"""
     
-    def __init__(self, strategy_provider='aws'):
-        self.s3_utils = S3Utils()
+    # Transcribe clients by region, shared by every instance in the container so warm
+    # invocations skip boto3 client construction
+    _transcribe_clients = {}
+    
+    def __init__(self, strategy_provider='aws', s3_utils=None):
+        """
+        Initialize the service
+        
+        Args:
+            strategy_provider (str, optional): The transcription provider ('aws', etc.)
+            s3_utils (S3Utils, optional): Utility for S3 operations to share with the caller;
+                a new one is created when omitted
+        """
+        self.s3_utils = s3_utils or S3Utils()
         self.output_bucket = os.environ.get('TRANSCRIPTION_OUTPUT_BUCKET')
         self.region = os.environ.get('TRANSCRIBE_REGION', 'us-east-1')
-        self.transcribe_client = boto3.client('transcribe', region_name=self.region)
+        self.transcribe_client = self._get_transcribe_client(self.region)
+        # Results are stored gzip-compressed unless explicitly disabled
+        self.compress_output = os.environ.get('TRANSCRIBE_COMPRESS', '1') != '0'
+        # Word-level segments are on unless explicitly disabled; sentence-level segments always are
+        self.include_segments = os.environ.get('TRANSCRIBE_INCLUDE_SEGMENTS', '1') != '0'
+        # Results are reused for identical content unless the cache is explicitly disabled
+        self.use_cache = os.environ.get('TRANSCRIBE_CACHE', '1') != '0'
         self.strategy = TranscriptionStrategyFactory.create_strategy(strategy_provider)
         
+    @classmethod
+    def _get_transcribe_client(cls, region):
+        """
+        Get the Transcribe client for a region, creating it on first use
+        
+        Args:
+            region (str): The AWS region for the Transcribe service
+            
+        Returns:
+            botocore.client.TranscribeService: The cached Transcribe client
+        """
+        client = cls._transcribe_clients.get(region)
+        if client is None:
+            client = cls._transcribe_clients[region] = boto3.client(
+                'transcribe', region_name=region, config=BOTO_CONFIG
+            )
+        return client
+    
     def set_strategy(self, strategy):
         """
         Set the transcription strategy
@@ -141,84 +229,243 @@ class TranscriptionService:
         """
         self.strategy = strategy
         
-    def process_media(self, bucket, key):
+    def process_media(self, bucket, key, include_segments=None, etag=None, wait_timeout_seconds=None):
         """
         Process an audio or video file from S3 and generate transcription using AWS Transcribe
         
+        Starts the job, waits for it to complete and then finalizes the result.
+        
         Args:
             bucket (str): Source S3 bucket name
             key (str): S3 object key for the audio or video file
+            include_segments (bool, optional): Whether to include word-level segments in the
+                result; defaults to the TRANSCRIBE_INCLUDE_SEGMENTS setting
+            etag (str, optional): ETag of the media file when the caller already has it;
+                fetched from S3 when omitted
+            wait_timeout_seconds (float, optional): Maximum time to wait for the Transcribe job,
+                e.g. derived from the Lambda's remaining time; defaults to _WAIT_TIMEOUT_SECONDS
             
         Returns:
             str: The S3 key where the transcription was saved
         """
-        logger.info(f"Starting transcription process for {key}")
+        logger.info("Starting transcription process for %s", key)
+        
+        if include_segments is None:
+            include_segments = self.include_segments
         
+        try:
+            # Identical content was transcribed before: reuse that result instead of a new job
+            cache_key = self._get_cache_key(bucket, key, include_segments, etag) if self.use_cache else None
+            if cache_key:
+                output_key = self._load_cached_result(key, cache_key)
+                if output_key:
+                    return output_key
+            
+            job_name, media_type = self.start_transcription_job(bucket, key)
+            
+            # Wait for transcription job to complete
+            transcription = self._wait_for_transcription(
+                job_name, timeout_seconds=wait_timeout_seconds, include_segments=include_segments
+            )
+            
+            output_key = self.finalize_transcription(
+                key, job_name, media_type, transcription, include_segments=include_segments
+            )
+            
+            if cache_key:
+                self._store_cached_result(output_key, cache_key)
+            
+            return output_key
+            
+        except Exception as e:
+            logger.error("Error during transcription: %s", e)
+            raise
+    
+    def start_transcription_job(self, bucket, key):
+        """
+        Start an AWS Transcribe job for an audio or video file without waiting for it
+        
+        Args:
+            bucket (str): Source S3 bucket name
+            key (str): S3 object key for the audio or video file
+            
+        Returns:
+            tuple: (job_name, media_type) needed to finalize the transcription later
+        """
         # Generate a unique job name for AWS Transcribe
-        job_name = f"transcribe-{str(uuid.uuid4())}"
+        job_name = f"transcribe-{uuid.uuid4().hex}"
         file_uri = f"s3://{bucket}/{key}"
         
         # Determine if the file is audio or video based on extension
-        extension = os.path.splitext(key)[1][1:].lower()
-        
-        # Set media format and type based on file extension
-        media_format = extension
+        extension = _split_key(key)[1].lower()
         
-        # Determine if it's audio or video based on the extension
-        if extension in ['mp3', 'wav', 'flac', 'ogg', 'amr']:
-            media_type = 'audio'
-        elif extension in ['mp4', 'avi', 'mov', 'mkv', 'webm']:
-            media_type = 'video'
-        else:
-            logger.warning(f"Unsupported file extension: {extension}, defaulting to audio")
-            media_type = 'audio'
+        # Set media type and format based on file extension
+        media_info = _MEDIA_FORMATS.get(extension)
+        if media_info is None:
+            logger.warning("Unsupported file extension: %s, defaulting to audio", extension)
+            media_info = ('audio', extension)
+        media_type, media_format = media_info
             
-        logger.info(f"Processing {media_type} file in {media_format} format")
+        logger.info("Processing %s file in %s format", media_type, media_format)
         
-        try:
-            # Start the transcription job
-            self.transcribe_client.start_transcription_job(
-                TranscriptionJobName=job_name,
-                Media={'MediaFileUri': file_uri},
-                MediaFormat=media_format,
-                LanguageCode='en-US',  # Default to English, could be parameterized
-                OutputBucketName=self.output_bucket,
-                OutputKey=f"raw_transcriptions/{job_name}.json"
-            )
-            
-            # Wait for transcription job to complete
-            transcription_text, segments, audio_segments = self._wait_for_transcription(job_name)
+        # Start the transcription job
+        self.transcribe_client.start_transcription_job(
+            TranscriptionJobName=job_name,
+            Media={'MediaFileUri': file_uri},
+            MediaFormat=media_format,
+            LanguageCode=_LANGUAGE_CODE,
+            OutputBucketName=self.output_bucket,
+            OutputKey=f"raw_transcriptions/{job_name}.json"
+        )
+        
+        return job_name, media_type
+    
+    def finalize_transcription(self, key, job_name, media_type, transcription=None, include_segments=None):
+        """
+        Build the transcription result for a completed job and save it to S3
+        
+        Args:
+            key (str): S3 object key of the original audio or video file
+            job_name (str): The completed AWS Transcribe job name
+            media_type (str): Type of media ('audio' or 'video')
+            transcription (tuple, optional): (transcription_text, word_segments, audio_segments)
+                already extracted from the job output; read through the strategy when omitted
+            include_segments (bool, optional): Whether to include word-level segments when reading
+                the job output; defaults to the TRANSCRIBE_INCLUDE_SEGMENTS setting
             
-            # Create result object with our standard format
-            result = TranscriptionResult(
-                original_file=key,
-                transcription_text=transcription_text,
-                timestamp=self.s3_utils.get_current_timestamp(),
-                job_name=job_name,
-                media_type=media_type,
-                segments=segments,
-                audio_segments=audio_segments
+        Returns:
+            str: The S3 key where the transcription was saved
+        """
+        if transcription is None:
+            if include_segments is None:
+                include_segments = self.include_segments
+            transcription = self.strategy.process_transcription(
+                job_name, self.output_bucket, self.s3_utils, include_segments=include_segments
             )
+        transcription_text, segments, audio_segments = transcription
+        
+        # Create result object with our standard format
+        result = TranscriptionResult(
+            original_file=key,
+            transcription_text=transcription_text,
+            timestamp=self.s3_utils.get_current_timestamp(),
+            job_name=job_name,
+            media_type=media_type,
+            segments=segments,
+            audio_segments=audio_segments
+        )
+        
+        return self._save_result(key, result)
+    
+    def _save_result(self, key, result):
+        """
+        Save a transcription result to S3 in our standard format
+        
+        Args:
+            key (str): S3 object key of the original audio or video file
+            result (TranscriptionResult): The result to save
             
-            # Save result to S3 in our standard format
-            output_key = f"transcriptions/{os.path.splitext(os.path.basename(key))[0]}.json"
+        Returns:
+            str: The S3 key where the transcription was saved
+        """
+        output_key = f"transcriptions/{_split_key(key)[0]}.json"
+        if self.compress_output:
+            output_key += '.gz'
+            self.s3_utils.upload_json_gzip(self.output_bucket, output_key, result.to_dict())
+        else:
             self.s3_utils.upload_json(self.output_bucket, output_key, result.to_dict())
+        
+        logger.info("Transcription complete. Result saved to %s/%s", self.output_bucket, output_key)
+        return output_key
+    
+    def _get_cache_key(self, bucket, key, include_segments=True, etag=None):
+        """
+        Build the result cache key for a media file from its content hash
+        
+        Args:
+            bucket (str): Source S3 bucket name
+            key (str): S3 object key for the audio or video file
+            include_segments (bool, optional): Whether the result includes word-level segments
+            etag (str, optional): ETag of the media file; fetched from S3 when omitted
             
-            logger.info(f"Transcription complete. Result saved to {self.output_bucket}/{output_key}")
-            return output_key
+        Returns:
+            str: The cache key in the output bucket, or None if the ETag is unavailable
+        """
+        if not etag:
+            etag = self.s3_utils.get_object_etag(bucket, key)
+        if not etag:
+            return None
+        # Results without word-level segments must not be served when segments are wanted
+        suffix = '' if include_segments else '_nosegments'
+        return f"transcriptions_cache/{etag}_{_LANGUAGE_CODE}{suffix}.json"
+    
+    def _load_cached_result(self, key, cache_key):
+        """
+        Load a previously cached transcription result for a media file and save it as
+        the file's result, if there is one
+        
+        The cache is best-effort: if it cannot be checked the media file is transcribed.
+        
+        Args:
+            key (str): S3 object key of the original audio or video file
+            cache_key (str): The cache key in the output bucket
             
+        Returns:
+            str: The S3 key where the transcription was saved, or None on a cache miss
+        """
+        try:
+            cached = self.s3_utils.object_exists(self.output_bucket, cache_key)
+        except (BotoCoreError, ClientError) as e:
+            logger.warning("Could not check cached result %s, treating as a miss: %s", cache_key, e)
+            cached = False
+        
+        if not cached:
+            logger.info("cache_miss for %s (%s)", key, cache_key)
+            return None
+        
+        try:
+            result = TranscriptionResult.from_dict(self.s3_utils.download_json(self.output_bucket, cache_key))
         except Exception as e:
-            logger.error(f"Error during transcription: {str(e)}")
-            raise
+            logger.warning("Ignoring unreadable cached result %s: %s", cache_key, e)
+            return None
+        
+        logger.info("cache_hit for %s (%s)", key, cache_key)
+        
+        # The same content may have been uploaded under another key
+        result.original_file = key
+        result.timestamp = self.s3_utils.get_current_timestamp()
+        return self._save_result(key, result)
     
-    def _wait_for_transcription(self, job_name, max_attempts=30, delay_seconds=10):
+    def _store_cached_result(self, output_key, cache_key):
+        """
+        Copy a saved transcription result into the cache, if possible
+        
+        The result is already saved, so a failed copy only costs a future cache hit.
+        
+        Args:
+            output_key (str): The S3 key where the transcription was saved
+            cache_key (str): The cache key in the output bucket
+        """
+        try:
+            self.s3_utils.copy_object(self.output_bucket, output_key, self.output_bucket, cache_key)
+        except (BotoCoreError, ClientError) as e:
+            logger.warning("Could not cache result %s as %s: %s", output_key, cache_key, e)
+    
+    def _wait_for_transcription(self, job_name, timeout_seconds=None, initial_delay_seconds=0.5, max_delay_seconds=15,
+                                include_segments=True):
         """
         Wait for AWS Transcribe job to complete and retrieve the result
         
+        The job status is polled with exponential backoff, so short jobs are picked up
+        within a second or two while long jobs are not polled more often than needed.
+        
         Args:
             job_name (str): The AWS Transcribe job name to wait for
-            max_attempts (int, optional): Maximum number of attempts before giving up
-            delay_seconds (int, optional): Delay between status check attempts in seconds
+            timeout_seconds (float, optional): Maximum time to wait before giving up;
+                defaults to _WAIT_TIMEOUT_SECONDS
+            initial_delay_seconds (float, optional): Delay after the first status check
+            max_delay_seconds (float, optional): Upper bound for the delay between status checks
+            include_segments (bool, optional): Whether to extract word-level segments
             
         Returns:
             tuple: The transcription text and processed segments
@@ -226,9 +473,13 @@ class TranscriptionService:
         Raises:
             Exception: If the transcription job fails or times out
         """
+        if timeout_seconds is None:
+            timeout_seconds = _WAIT_TIMEOUT_SECONDS
+        deadline = time.monotonic() + timeout_seconds
+        delay = initial_delay_seconds
         attempt = 0
         
-        while attempt < max_attempts:
+        while True:
             attempt += 1
             
             response = self.transcribe_client.get_transcription_job(
@@ -236,22 +487,29 @@ class TranscriptionService:
             )
             
             status = response['TranscriptionJob']['TranscriptionJobStatus']
-            logger.info(f"Transcription job {job_name} status: {status} (attempt {attempt}/{max_attempts})")
+            logger.info("Transcription job %s status: %s (attempt %s)", job_name, status, attempt)
             
             if status == 'COMPLETED':
-                logger.info(f"Transcription job {job_name} completed successfully")
+                logger.info("Transcription job %s completed successfully", job_name)
                 
                 # Use the selected strategy to process the transcription result
-                return self.strategy.process_transcription(job_name, self.output_bucket, self.s3_utils)
+                return self.strategy.process_transcription(
+                    job_name, self.output_bucket, self.s3_utils, include_segments=include_segments
+                )
             
             elif status == 'FAILED':
                 error_message = response['TranscriptionJob'].get('FailureReason', 'Unknown error')
-                logger.error(f"Transcription job {job_name} failed: {error_message}")
+                logger.error("Transcription job %s failed: %s", job_name, error_message)
                 raise Exception(f"Transcription job failed: {error_message}")
             
-            # Sleep before the next attempt
-            time.sleep(delay_seconds)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            
+            # Sleep before the next attempt, never past the deadline so the last check lands on it
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 1.7, max_delay_seconds)
         
-        # If max attempts reached without completion
-        logger.error(f"Transcription job {job_name} did not complete within {max_attempts} attempts")
-        raise Exception(f"Transcription job timed out after {max_attempts} attempts") 
\ No newline at end of file
+        # If the deadline passed without completion
+        logger.error("Transcription job %s did not complete within %s seconds", job_name, timeout_seconds)
+        raise Exception(f"Transcription job timed out after {timeout_seconds} seconds")
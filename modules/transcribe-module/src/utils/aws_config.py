@@ -0,0 +1,10 @@
+from botocore.config import Config
+
+# Shared by every boto3 client in the module. botocore's default pool of 10
+# connections matches the transfer concurrency in S3Utils, and adaptive retries
+# let the SDK back off when Transcribe or S3 throttle us.
+BOTO_CONFIG = Config(
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    connect_timeout=3,
+    read_timeout=10
+)
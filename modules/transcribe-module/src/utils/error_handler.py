@@ -16,7 +16,7 @@ def handle_error(exception, message="An error occurred"):
         dict: Response containing error details
     """
     error_trace = traceback.format_exc()
-    logger.error(f"{message}: {str(exception)}")
+    logger.error("%s: %s", message, exception)
     logger.error(error_trace)
     
     return {
@@ -1,18 +1,57 @@
-"""Utility functions for handling metadata sanitization."""
+"""
+Utility functions for handling metadata sanitization.
+
+Perf note: do not @njit this module. Numba's nopython mode does not support
+general str operations or the re module, and object mode is slower than plain
+CPython. The JIT compile cost would also land on every Lambda cold start, and
+values are at most a couple of KB (the S3 user-metadata limit). Precompiled
+regexes and the per-value cache are the fast path here.
+"""
+import functools
 import re
 from typing import Dict, Optional
 
+# Define patterns for sanitization in order of application. The later cleanup
+# rules rely on lookarounds, so these stay on the standard library engine.
+_PATTERNS = (
+    # Remove script and style tags with their content, and HTML comments, in one pass
+    (re.compile(
+        r'<script\b[^>]*>.*?</script>|<style\b[^>]*>.*?</style>|<!--.*?-->',
+        re.IGNORECASE | re.DOTALL
+    ), ''),
+    # Replace HTML/XML tags and special characters other than allowed punctuation
+    # (which includes control characters) with a space, in a single pass.
+    # Whitespace is left for the rules below, which all accept any whitespace.
+    # A '<' that does not open a tag is matched on its own so it cannot swallow
+    # the tag name that follows it.
+    (re.compile(r'<[^>]+>|[^\w\s\-.,!?()\'\"&/:@<]+|<'), ' '),
+    # Clean up specific patterns
+    (re.compile(r'(?<=\d)\s+(?=:)'), ''),  # Remove space before colon in time
+    (re.compile(r'(?<=[AP])\s+(?=M\b)'), ''),  # Fix AM/PM spacing
+    (re.compile(r'\s*&\s*'), ' & '),  # Normalize spaces around ampersands
+    (re.compile(r'\s*/\s*'), '/'),  # Remove spaces around slashes
+    # Replace multiple spaces with single space
+    (re.compile(r'\s+'), ' ')
+)
+
+# Allowed metadata keys, in the order they appear in the sanitized result
+_ALLOWED_KEYS = ('speaker', 'title', 'track', 'day')
+
+# Maximum length of a sanitized value
+_MAX_VALUE_LENGTH = 256
+
+
 def sanitize_metadata(metadata: Optional[Dict[str, str]]) -> Dict[str, str]:
     """
     Sanitize metadata by removing or replacing potentially problematic characters while preserving
     valid punctuation and formatting.
-    
+
     Args:
         metadata (Optional[Dict[str, str]]): The metadata dictionary to sanitize
-        
+
     Returns:
         Dict[str, str]: Sanitized metadata dictionary
-        
+
     Example:
         >>> metadata = {
         ...     'title': 'My <script>alert("xss")</script> Talk!',
@@ -23,66 +62,65 @@ def sanitize_metadata(metadata: Optional[Dict[str, str]]) -> Dict[str, str]:
     """
     if not metadata:
         return {}
-    
-    sanitized = {}
-    
-    # Define patterns for sanitization in order of application
-    patterns = [
-        # Remove script tags and their content first
-        (re.compile(r'<script\b[^>]*>.*?</script>', re.IGNORECASE | re.DOTALL), ''),
-        # Remove style tags and their content
-        (re.compile(r'<style\b[^>]*>.*?</style>', re.IGNORECASE | re.DOTALL), ''),
-        # Remove HTML comments
-        (re.compile(r'<!--.*?-->', re.DOTALL), ''),
-        # Remove HTML/XML tags
-        (re.compile(r'<[^>]+>'), ' '),
-        # Replace control characters and excessive whitespace with a single space
-        (re.compile(r'[\x00-\x1F\x7F\s]+'), ' '),
-        # First pass: Handle special cases
-        (re.compile(r'(?<=\d):(?=\d{2}\b)'), 'TIMECOLON'),  # Preserve time colons
-        (re.compile(r'(?<=[A-Za-z])/(?=[A-Za-z])'), 'SLASH'),  # Preserve category slashes
-        (re.compile(r'&(?=\s|$)'), 'AMPERSAND'),  # Preserve standalone ampersands
-        # Remove special characters except allowed punctuation
-        (re.compile(r'[^\w\s\-.,!?()\'\"&/:@]+'), ' '),
-        # Restore special cases
-        (re.compile(r'TIMECOLON'), ':'),
-        (re.compile(r'SLASH'), '/'),
-        (re.compile(r'AMPERSAND'), '&'),
-        # Clean up specific patterns
-        (re.compile(r'(?<=\d)\s+(?=:)'), ''),  # Remove space before colon in time
-        (re.compile(r'(?<=[AP])\s+(?=M\b)'), ''),  # Fix AM/PM spacing
-        (re.compile(r'\s*&\s*'), ' & '),  # Normalize spaces around ampersands
-        (re.compile(r'\s*/\s*'), '/'),  # Remove spaces around slashes
-        # Replace multiple spaces with single space
-        (re.compile(r'\s+'), ' ')
-    ]
-    
-    # Allowed metadata keys
-    allowed_keys = {'speaker', 'title', 'track', 'day'}
-    
-    for key, value in metadata.items():
-        # Skip if key is not in allowed keys
-        if key not in allowed_keys:
-            continue
-            
-        if not isinstance(value, str):
-            # Convert non-string values to strings
-            value = str(value)
-        
-        # Apply sanitization patterns in order
-        sanitized_value = value
-        for pattern, replacement in patterns:
-            sanitized_value = pattern.sub(replacement, sanitized_value)
-        
-        # Clean up extra whitespace
-        sanitized_value = sanitized_value.strip()
-        
-        # Truncate if too long (e.g., 256 characters)
-        if len(sanitized_value) > 256:
-            sanitized_value = sanitized_value[:253] + '...'
-            
-        # Only add non-empty values
-        if sanitized_value:
-            sanitized[key] = sanitized_value
-    
-    return sanitized 
\ No newline at end of file
+
+    # Bind to locals so the comprehension avoids repeated global lookups
+    clean = _clean_value
+    allowed_keys = _ALLOWED_KEYS
+
+    # Look up the allowed keys rather than scanning every incoming key, so
+    # unexpected keys cost nothing, and only keep non-empty values
+    return {
+        key: sanitized_value
+        for key in allowed_keys
+        if key in metadata
+        and (sanitized_value := clean(_to_str(metadata[key])))
+    }
+
+
+def _to_str(value) -> str:
+    """
+    Convert a metadata value to a string so it can be sanitized and cached.
+
+    Args:
+        value: The raw metadata value
+
+    Returns:
+        str: The string form of the value, or an empty string for None or
+        values that cannot be converted
+    """
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return ''
+    if isinstance(value, (int, float)):
+        return str(value)
+    # Arbitrary objects may define a __str__ that raises
+    try:
+        return str(value)
+    except Exception:
+        return ''
+
+
+@functools.lru_cache(maxsize=4096)
+def _clean_value(value: str) -> str:
+    """
+    Sanitize a single metadata value.
+
+    Results are cached because the same speaker, track and day values recur
+    across many talks.
+
+    Args:
+        value (str): The raw metadata value
+
+    Returns:
+        str: The sanitized value, or an empty string if nothing remains
+    """
+    # Apply sanitization patterns in order
+    for pattern, replacement in _PATTERNS:
+        value = pattern.sub(replacement, value)
+
+    # Clean up extra whitespace
+    value = value.strip()
+
+    # Truncate if too long, keeping the result within the limit including the ellipsis
+    return value if len(value) <= _MAX_VALUE_LENGTH else value[:_MAX_VALUE_LENGTH - 3] + '...'
@@ -2,8 +2,10 @@ import os
 import sys
 import pytest
 
-# Add the src directory to the Python path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+# Add the src directory to the Python path once for the whole session
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
 
 @pytest.fixture(autouse=True)
 def setup_aws_environment():
@@ -29,6 +31,15 @@ def setup_aws_environment():
                    'ENVIRONMENT', 'TRANSCRIPTION_OUTPUT_BUCKET', 'TRANSCRIBE_REGION']:
             os.environ.pop(key, None)
 
+@pytest.fixture(autouse=True)
+def reset_client_caches(monkeypatch):
+    """Start every test with empty class-level boto3 client caches, so no mocked client leaks between tests."""
+    from services.transcription_service import TranscriptionService
+    from utils.s3_utils import S3Utils
+
+    monkeypatch.setattr(TranscriptionService, '_transcribe_clients', {})
+    monkeypatch.setattr(S3Utils, '_s3_client', None)
+
 @pytest.fixture
 def lambda_context():
     """Fixture for mock Lambda context."""
@@ -1,36 +1,40 @@
 import unittest
 import json
-import os
-import sys
-sys.path.append(os.path.join(os.path.dirname(__file__), '../src'))
-
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import patch
 from handlers.transcribe_handler import lambda_handler
 
+
+def _s3_event(key, bucket='test-bucket'):
+    """Build an S3 notification event for a single uploaded object."""
+    return {'Records': [{'s3': {'bucket': {'name': bucket}, 'object': {'key': key}}}]}
+
+
 class TestTranscribeHandler(unittest.TestCase):
     
-    @patch('handlers.transcribe_handler.TranscriptionService')
-    @patch('handlers.transcribe_handler.S3Utils')
-    def test_lambda_handler_success_audio(self, mock_s3_utils, mock_transcription_service):
+    def setUp(self):
+        # Patch the handler's collaborators once per test instead of per-method decorators
+        service_patcher = patch('handlers.transcribe_handler.TranscriptionService')
+        s3_utils_patcher = patch('handlers.transcribe_handler.S3Utils')
+        mock_transcription_service = service_patcher.start()
+        mock_s3_utils = s3_utils_patcher.start()
+        self.addCleanup(service_patcher.stop)
+        self.addCleanup(s3_utils_patcher.stop)
+        
+        self.mock_service_instance = mock_transcription_service.return_value
+        self.mock_s3_utils_instance = mock_s3_utils.return_value
+    
+    def test_lambda_handler_success_audio(self):
         # Setup mock returns
-        mock_service_instance = MagicMock()
+        mock_service_instance = self.mock_service_instance
         mock_service_instance.process_media.return_value = 'transcriptions/audio_result.json'
-        mock_transcription_service.return_value = mock_service_instance
         
         # Setup S3Utils mock to return empty metadata
-        mock_s3_utils_instance = MagicMock()
-        mock_s3_utils_instance.get_object_metadata.return_value = {}
-        mock_s3_utils.return_value = mock_s3_utils_instance
+        mock_s3_utils_instance = self.mock_s3_utils_instance
+        mock_s3_utils_instance.head_object.return_value = {}
         
         # Create test event
-        event = {
-            'Records': [{
-                's3': {
-                    'bucket': {'name': 'test-bucket'},
-                    'object': {'key': 'audio/test.mp3'}
-                }
-            }]
-        }
+        event = _s3_event('audio/test.mp3')
         
         # Call the handler
         response = lambda_handler(event, {})
@@ -48,31 +52,20 @@ class TestTranscribeHandler(unittest.TestCase):
         self.assertEqual(response_body['metadata'], {})
         
         # Verify service calls
-        mock_s3_utils_instance.get_object_metadata.assert_called_once_with('test-bucket', 'audio/test.mp3')
-        mock_service_instance.process_media.assert_called_once_with('test-bucket', 'audio/test.mp3')
+        mock_s3_utils_instance.head_object.assert_called_once_with('test-bucket', 'audio/test.mp3')
+        mock_service_instance.process_media.assert_called_once_with('test-bucket', 'audio/test.mp3', etag=None, wait_timeout_seconds=None)
 
-    @patch('handlers.transcribe_handler.TranscriptionService')
-    @patch('handlers.transcribe_handler.S3Utils')
-    def test_lambda_handler_success_video(self, mock_s3_utils, mock_transcription_service):
+    def test_lambda_handler_success_video(self):
         # Setup mock returns
-        mock_service_instance = MagicMock()
+        mock_service_instance = self.mock_service_instance
         mock_service_instance.process_media.return_value = 'transcriptions/video_result.json'
-        mock_transcription_service.return_value = mock_service_instance
         
         # Setup S3Utils mock to return empty metadata
-        mock_s3_utils_instance = MagicMock()
-        mock_s3_utils_instance.get_object_metadata.return_value = {}
-        mock_s3_utils.return_value = mock_s3_utils_instance
+        mock_s3_utils_instance = self.mock_s3_utils_instance
+        mock_s3_utils_instance.head_object.return_value = {}
         
         # Create test event
-        event = {
-            'Records': [{
-                's3': {
-                    'bucket': {'name': 'test-bucket'},
-                    'object': {'key': 'videos/test.mp4'}
-                }
-            }]
-        }
+        event = _s3_event('videos/test.mp4')
         
         # Call the handler
         response = lambda_handler(event, {})
@@ -90,8 +83,8 @@ class TestTranscribeHandler(unittest.TestCase):
         self.assertEqual(response_body['metadata'], {})
         
         # Verify service calls
-        mock_s3_utils_instance.get_object_metadata.assert_called_once_with('test-bucket', 'videos/test.mp4')
-        mock_service_instance.process_media.assert_called_once_with('test-bucket', 'videos/test.mp4')
+        mock_s3_utils_instance.head_object.assert_called_once_with('test-bucket', 'videos/test.mp4')
+        mock_service_instance.process_media.assert_called_once_with('test-bucket', 'videos/test.mp4', etag=None, wait_timeout_seconds=None)
     
     def test_lambda_handler_missing_records(self):
         # Create test event with no records
@@ -104,33 +97,25 @@ class TestTranscribeHandler(unittest.TestCase):
         self.assertEqual(response['statusCode'], 400)
         self.assertEqual(json.loads(response['body']), 'No records found in event')
 
-    @patch('handlers.transcribe_handler.TranscriptionService')
-    @patch('handlers.transcribe_handler.S3Utils')
-    def test_lambda_handler_with_metadata(self, mock_s3_utils, mock_transcription_service):
+    def test_lambda_handler_with_metadata(self):
         # Setup mock returns
-        mock_service_instance = MagicMock()
+        mock_service_instance = self.mock_service_instance
         mock_service_instance.process_media.return_value = 'transcriptions/test_with_metadata.json'
-        mock_transcription_service.return_value = mock_service_instance
-        
-        # Setup S3Utils mock to return metadata
-        mock_s3_utils_instance = MagicMock()
-        mock_s3_utils_instance.get_object_metadata.return_value = {
-            'speaker': 'John Doe',
-            'title': 'Test Talk',
-            'track': 'Technical Track',
-            'day': 'Monday'
+        
+        # Setup S3Utils mock to return metadata and the ETag of the media file
+        mock_s3_utils_instance = self.mock_s3_utils_instance
+        mock_s3_utils_instance.head_object.return_value = {
+            'ETag': '"abc123"',
+            'Metadata': {
+                'speaker': 'John Doe',
+                'title': 'Test Talk',
+                'track': 'Technical Track',
+                'day': 'Monday'
+            }
         }
-        mock_s3_utils.return_value = mock_s3_utils_instance
         
         # Create test event
-        event = {
-            'Records': [{
-                's3': {
-                    'bucket': {'name': 'test-bucket'},
-                    'object': {'key': 'test/file.mp4'}
-                }
-            }]
-        }
+        event = _s3_event('test/file.mp4')
         
         # Call the handler
         response = lambda_handler(event, {})
@@ -156,31 +141,20 @@ class TestTranscribeHandler(unittest.TestCase):
         self.assertEqual(event_metadata, metadata)
         
         # Verify service calls
-        mock_s3_utils_instance.get_object_metadata.assert_called_once_with('test-bucket', 'test/file.mp4')
-        mock_service_instance.process_media.assert_called_once_with('test-bucket', 'test/file.mp4')
+        mock_s3_utils_instance.head_object.assert_called_once_with('test-bucket', 'test/file.mp4')
+        mock_service_instance.process_media.assert_called_once_with('test-bucket', 'test/file.mp4', etag='abc123', wait_timeout_seconds=None)
 
-    @patch('handlers.transcribe_handler.TranscriptionService')
-    @patch('handlers.transcribe_handler.S3Utils')
-    def test_lambda_handler_without_metadata(self, mock_s3_utils, mock_transcription_service):
+    def test_lambda_handler_without_metadata(self):
         # Setup mock returns
-        mock_service_instance = MagicMock()
+        mock_service_instance = self.mock_service_instance
         mock_service_instance.process_media.return_value = 'transcriptions/test_without_metadata.json'
-        mock_transcription_service.return_value = mock_service_instance
         
         # Setup S3Utils mock to return empty metadata
-        mock_s3_utils_instance = MagicMock()
-        mock_s3_utils_instance.get_object_metadata.return_value = {}
-        mock_s3_utils.return_value = mock_s3_utils_instance
+        mock_s3_utils_instance = self.mock_s3_utils_instance
+        mock_s3_utils_instance.head_object.return_value = {}
         
         # Create test event
-        event = {
-            'Records': [{
-                's3': {
-                    'bucket': {'name': 'test-bucket'},
-                    'object': {'key': 'test/file.mp4'}
-                }
-            }]
-        }
+        event = _s3_event('test/file.mp4')
         
         # Call the handler
         response = lambda_handler(event, {})
@@ -199,5 +173,17 @@ class TestTranscribeHandler(unittest.TestCase):
         self.assertEqual(response['detail']['records'][0]['metadata'], {})
         
         # Verify service calls
-        mock_s3_utils_instance.get_object_metadata.assert_called_once_with('test-bucket', 'test/file.mp4')
-        mock_service_instance.process_media.assert_called_once_with('test-bucket', 'test/file.mp4') 
\ No newline at end of file
+        mock_s3_utils_instance.head_object.assert_called_once_with('test-bucket', 'test/file.mp4')
+        mock_service_instance.process_media.assert_called_once_with('test-bucket', 'test/file.mp4', etag=None, wait_timeout_seconds=None)
+
+    def test_lambda_handler_waits_within_remaining_time(self):
+        self.mock_service_instance.process_media.return_value = 'transcriptions/test.json'
+        self.mock_s3_utils_instance.head_object.return_value = {}
+        context = SimpleNamespace(get_remaining_time_in_millis=lambda: 300000)
+        
+        response = lambda_handler(_s3_event('audio/test.mp3'), context)
+        
+        self.assertEqual(response['statusCode'], 200)
+        self.mock_service_instance.process_media.assert_called_once_with(
+            'test-bucket', 'audio/test.mp3', etag=None, wait_timeout_seconds=280
+        )
@@ -1,6 +1,6 @@
 """Tests for metadata sanitization utilities."""
 import pytest
-from src.utils.metadata_utils import sanitize_metadata
+from src.utils.metadata_utils import sanitize_metadata, _clean_value
 
 def test_sanitize_metadata_with_valid_input():
     """Test sanitization with valid metadata."""
@@ -129,6 +129,15 @@ def test_sanitize_metadata_with_non_string_values():
     sanitized = sanitize_metadata(metadata)
     assert all(isinstance(v, str) for v in sanitized.values())
 
+def test_sanitize_metadata_caches_repeated_values():
+    """Test repeated values are served from the per-value cache."""
+    _clean_value.cache_clear()
+    metadata = {'speaker': 'John Doe', 'track': 'Technical Track', 'day': 'Monday'}
+    first = sanitize_metadata(metadata)
+    second = sanitize_metadata(dict(metadata))
+    assert first == second == metadata
+    assert _clean_value.cache_info().hits == 3
+
 def test_sanitize_metadata_real_world_scenario():
     """
     Test sanitization with a real-world scenario including complex metadata
@@ -191,6 +200,20 @@ def test_sanitize_metadata_with_exotic_types(invalid_input):
         assert isinstance(value, str)
         assert len(value) <= 256
 
+def test_sanitize_metadata_drops_unconvertible_values():
+    """Test None values and values whose __str__ raises are dropped."""
+    class Unprintable:
+        def __str__(self):
+            raise ValueError('no string form')
+
+    metadata = {
+        'speaker': None,
+        'title': Unprintable(),
+        'track': 3.5,
+        'day': 'Monday'
+    }
+    assert sanitize_metadata(metadata) == {'track': '3.5', 'day': 'Monday'}
+
 def test_sanitize_metadata_with_complex_html():
     """Test sanitization with more complex HTML scenarios."""
     metadata = {
@@ -0,0 +1,133 @@
+"""Tests for the S3 utilities."""
+import datetime
+import gzip
+import io
+import json
+import pytest
+import utils.s3_utils as s3_utils_module
+from botocore.exceptions import ClientError
+from unittest.mock import patch
+from utils.aws_config import BOTO_CONFIG
+from utils.s3_utils import S3Utils, _DOWNLOAD_CONFIG, _UPLOAD_CONFIG
+
+
+@pytest.fixture
+def s3_utils():
+    """S3Utils with a mocked client; the shared client cache is reset by conftest."""
+    with patch('boto3.client'):
+        return S3Utils()
+
+
+def test_upload_json_gzip(s3_utils):
+    data = {'transcription_text': 'hello world ' * 200, 'segments': []}
+
+    s3_utils.upload_json_gzip('test-bucket', 'transcriptions/test.json.gz', data)
+
+    kwargs = s3_utils.s3_client.put_object.call_args.kwargs
+    assert (kwargs['Bucket'], kwargs['Key']) == ('test-bucket', 'transcriptions/test.json.gz')
+    assert (kwargs['ContentType'], kwargs['ContentEncoding']) == ('application/json', 'gzip')
+    assert len(kwargs['Body']) < len(json.dumps(data))
+    assert json.loads(gzip.decompress(kwargs['Body'])) == data
+
+
+def test_download_json(s3_utils):
+    data = {'results': {'transcripts': [{'transcript': 'Grüße aus Köln'}]}}
+    s3_utils.s3_client.get_object.return_value = {'Body': io.BytesIO(json.dumps(data, ensure_ascii=False).encode('utf-8'))}
+
+    assert s3_utils.download_json('test-bucket', 'raw_transcriptions/job-1.json') == data
+    s3_utils.s3_client.get_object.assert_called_once_with(Bucket='test-bucket', Key='raw_transcriptions/job-1.json')
+
+
+@pytest.mark.parametrize("code,expected", [(None, True), ('404', False)])
+def test_object_exists(s3_utils, code, expected):
+    if code:
+        s3_utils.s3_client.head_object.side_effect = ClientError({'Error': {'Code': code}}, 'HeadObject')
+
+    assert s3_utils.object_exists('test-bucket', 'transcriptions_cache/abc.json') is expected
+
+
+def test_object_exists_propagates_other_errors(s3_utils):
+    s3_utils.s3_client.head_object.side_effect = ClientError({'Error': {'Code': '403'}}, 'HeadObject')
+
+    with pytest.raises(ClientError):
+        s3_utils.object_exists('test-bucket', 'transcriptions_cache/abc.json')
+
+
+def test_head_object_and_etag(s3_utils):
+    s3_utils.s3_client.head_object.return_value = {'ETag': '"abc123"', 'Metadata': {'speaker': 'Jane'}}
+
+    assert s3_utils.get_object_metadata('test-bucket', 'media/talk.mp4') == {'speaker': 'Jane'}
+    assert s3_utils.get_object_etag('test-bucket', 'media/talk.mp4') == 'abc123'
+
+
+def test_head_object_failure_returns_empty(s3_utils):
+    s3_utils.s3_client.head_object.side_effect = ClientError({'Error': {'Code': '403'}}, 'HeadObject')
+
+    assert s3_utils.head_object('test-bucket', 'media/talk.mp4') == {}
+    assert s3_utils.get_object_etag('test-bucket', 'media/talk.mp4') is None
+
+
+def test_upload_json_is_compact(s3_utils):
+    data = {'transcription_text': 'hello', 'segments': [{'id': 0, 'items': [0, 1]}]}
+
+    s3_utils.upload_json('test-bucket', 'transcriptions/test.json', data)
+
+    body = s3_utils.s3_client.put_object.call_args.kwargs['Body']
+    assert body == b'{"transcription_text":"hello","segments":[{"id":0,"items":[0,1]}]}'
+    assert json.loads(body) == data
+
+
+def test_download_json_gzip(s3_utils):
+    data = {'transcription_text': 'hello world'}
+    s3_utils.s3_client.get_object.return_value = {
+        'Body': io.BytesIO(gzip.compress(json.dumps(data).encode('utf-8'))),
+        'ContentEncoding': 'gzip'
+    }
+
+    assert s3_utils.download_json('test-bucket', 'transcriptions/test.json.gz') == data
+
+
+def test_client_is_shared_and_honours_endpoint(monkeypatch):
+    monkeypatch.setenv('AWS_ENDPOINT_URL_S3', 'http://localhost:4566')
+
+    with patch('boto3.client') as mock_client:
+        first, second = S3Utils(), S3Utils()
+
+    assert first.s3_client is second.s3_client
+    mock_client.assert_called_once_with('s3', endpoint_url='http://localhost:4566', config=BOTO_CONFIG)
+
+
+def test_upload_file_uses_multipart_config(s3_utils):
+    s3_utils.upload_file('/tmp/talk.mp4', 'test-bucket', 'media/talk.mp4')
+
+    s3_utils.s3_client.upload_file.assert_called_once_with(
+        '/tmp/talk.mp4', 'test-bucket', 'media/talk.mp4', Config=_UPLOAD_CONFIG
+    )
+
+
+def test_download_file_uses_ranged_config(s3_utils):
+    s3_utils.download_file('test-bucket', 'media/talk.mp4', '/tmp/talk.mp4')
+
+    s3_utils.s3_client.download_file.assert_called_once_with(
+        'test-bucket', 'media/talk.mp4', '/tmp/talk.mp4', Config=_DOWNLOAD_CONFIG
+    )
+
+
+def test_get_current_timestamp_is_utc(s3_utils):
+    timestamp = datetime.datetime.fromisoformat(s3_utils.get_current_timestamp())
+
+    assert timestamp.utcoffset() == datetime.timedelta(0)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_json_round_trip_with_and_without_orjson(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(s3_utils_module, 'orjson', None)
+    elif s3_utils_module.orjson is None:
+        pytest.skip("orjson is not installed")
+    data = {'transcription_text': 'Grüße', 'segments': [{'id': 0, 'items': [0, 1]}]}
+
+    body = s3_utils_module._dump_json(data)
+
+    assert isinstance(body, bytes)
+    assert s3_utils_module._load_json(body) == data
@@ -0,0 +1,46 @@
+"""Tests for the transcription result model."""
+from models.transcription_result import TranscriptionResult
+
+
+def test_transcription_result_model():
+    expected = {
+        'original_file': 'test.mp3',
+        'transcription_text': 'Hello world.',
+        'timestamp': '2024-01-01T00:00:00',
+        'media_type': 'audio',
+        'job_name': 'transcribe-test-uuid',
+        'segments': [
+            {'type': 'pronunciation', 'content': 'Hello', 'start_time': '0.0', 'end_time': '0.4', 'confidence': '0.99'}
+        ],
+        'audio_segments': [
+            {'id': 0, 'transcript': 'Hello world.', 'start_time': '0.0', 'end_time': '0.9', 'items': [0]}
+        ]
+    }
+
+    # Compare whole dicts so a mismatch shows every differing field at once
+    assert TranscriptionResult(**expected).to_dict() == expected
+    assert TranscriptionResult.from_dict(expected).to_dict() == expected
+
+
+def test_transcription_result_model_defaults():
+    result = TranscriptionResult.from_dict({
+        'original_file': 'test.mp4',
+        'transcription_text': 'Hi',
+        'timestamp': '2024-01-01T00:00:00'
+    })
+
+    # Optional fields fall back to their defaults and empty ones are omitted
+    assert result.to_dict() == {
+        'original_file': 'test.mp4',
+        'transcription_text': 'Hi',
+        'timestamp': '2024-01-01T00:00:00',
+        'media_type': 'audio'
+    }
+
+
+def test_transcription_result_uses_slots():
+    result = TranscriptionResult('test.mp3', 'Hi', '2024-01-01T00:00:00')
+
+    assert not hasattr(result, '__dict__')
+    result.original_file = 'other.mp3'
+    assert result.to_dict()['original_file'] == 'other.mp3'
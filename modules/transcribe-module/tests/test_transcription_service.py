@@ -0,0 +1,414 @@
+"""Tests for the transcription service."""
+import copy
+import pytest
+from botocore.exceptions import ClientError
+from types import MappingProxyType, SimpleNamespace
+from unittest.mock import patch, MagicMock
+from services.transcription_service import TranscriptionService, AWSTranscribeStrategy, _split_key
+from utils.aws_config import BOTO_CONFIG
+from utils.s3_utils import S3Utils
+
+
+_SEGMENTS = [
+    {'type': 'pronunciation', 'content': 'test', 'start_time': '0.0', 'end_time': '0.5', 'confidence': '0.99'}
+]
+_AUDIO_SEGMENTS = [
+    {'id': 0, 'transcript': 'This is a test transcription', 'start_time': '0.0', 'end_time': '2.0', 'items': [0]}
+]
+_TRANSCRIPTION_TEXT = "This is a test transcription"
+# Shared _wait_for_transcription return value; tests never mutate it
+_WAIT_RESULT = (_TRANSCRIPTION_TEXT, _SEGMENTS, _AUDIO_SEGMENTS)
+
+# Fields every uploaded result shares; read-only so no test can alter them for the others
+_RESULT_DEFAULTS = MappingProxyType({
+    'timestamp': '2024-01-01T00:00:00',
+    'job_name': 'transcribe-test-uuid'
+})
+
+
+@pytest.fixture(autouse=True)
+def sleeps(monkeypatch):
+    """Never really sleep or draw random job ids; record requested sleep durations instead."""
+    sleeps = []
+    clock = [0.0]
+
+    def sleep(seconds):
+        # Advance a fake monotonic clock so deadline-based loops still terminate
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr('time.sleep', sleep)
+    monkeypatch.setattr('time.monotonic', lambda: clock[0])
+    monkeypatch.setattr('uuid.uuid4', lambda: SimpleNamespace(hex='test-uuid'))
+    return sleeps
+
+
+@pytest.fixture(scope="module")
+def service_template():
+    """Build one TranscriptionService per module; constructing boto3 clients is the expensive part."""
+    # Module-scoped fixtures run before the per-test cache reset, so keep the mocked
+    # clients out of the shared class-level caches here as well
+    with pytest.MonkeyPatch.context() as mp, patch('boto3.client'):
+        mp.setattr(TranscriptionService, '_transcribe_clients', {})
+        mp.setattr(S3Utils, '_s3_client', None)
+        return TranscriptionService()
+
+
+@pytest.fixture
+def service(service_template):
+    """Return a per-test copy of the template service with fresh mocks attached."""
+    service = copy.copy(service_template)
+    service.s3_utils = MagicMock(spec=S3Utils)
+    service.s3_utils.get_current_timestamp.return_value = _RESULT_DEFAULTS['timestamp']
+    # No ETag means no result caching unless a test opts in
+    service.s3_utils.get_object_etag.return_value = None
+    service.transcribe_client = MagicMock()
+    service.output_bucket = 'test-output-bucket'
+    # Plain JSON uploads unless a test opts in to compression
+    service.compress_output = False
+    service.use_cache = True
+    return service
+
+
+def _expected(original_file, text, media_type, segments=_SEGMENTS, audio_segments=_AUDIO_SEGMENTS):
+    """Build the result dict process_media is expected to upload."""
+    expected = {
+        'original_file': original_file,
+        'transcription_text': text,
+        'media_type': media_type,
+        **_RESULT_DEFAULTS
+    }
+    if segments:
+        expected['segments'] = segments
+    if audio_segments:
+        expected['audio_segments'] = audio_segments
+    return expected
+
+
+def test_service_initialization_with_custom_environment(monkeypatch):
+    monkeypatch.setenv('TRANSCRIPTION_OUTPUT_BUCKET', 'custom-output-bucket')
+    monkeypatch.setenv('TRANSCRIBE_REGION', 'eu-west-1')
+
+    with patch('boto3.client') as mock_client:
+        service = TranscriptionService()
+
+    assert (service.output_bucket, service.region) == ('custom-output-bucket', 'eu-west-1')
+    mock_client.assert_any_call('transcribe', region_name='eu-west-1', config=BOTO_CONFIG)
+    assert isinstance(service.strategy, AWSTranscribeStrategy)
+    assert service.compress_output is True
+    assert service.use_cache is True
+
+
+def test_service_initialization_without_compression(monkeypatch):
+    monkeypatch.setenv('TRANSCRIBE_COMPRESS', '0')
+
+    with patch('boto3.client') as mock_client:
+        service = TranscriptionService()
+
+    assert service.compress_output is False
+    mock_client.assert_any_call('transcribe', region_name='us-east-1', config=BOTO_CONFIG)
+
+
+def test_service_initialization_without_cache(monkeypatch):
+    monkeypatch.setenv('TRANSCRIBE_CACHE', '0')
+
+    with patch('boto3.client'):
+        service = TranscriptionService()
+
+    assert service.use_cache is False
+
+
+def test_service_reuses_transcribe_client():
+    s3_utils = MagicMock(spec=S3Utils)
+
+    with patch('boto3.client') as mock_client:
+        first = TranscriptionService(s3_utils=s3_utils)
+        second = TranscriptionService(s3_utils=s3_utils)
+
+    assert first.transcribe_client is second.transcribe_client
+    assert first.s3_utils is s3_utils
+    mock_client.assert_called_once_with('transcribe', region_name='us-east-1', config=BOTO_CONFIG)
+
+
+@pytest.mark.parametrize("key,media_format,media_type,output_key", [
+    ("audio/test_audio.mp3", "mp3", "audio", "transcriptions/test_audio.json"),
+    ("videos/test_video.mp4", "mp4", "video", "transcriptions/test_video.json"),
+    ("audio/test_audio.wav", "wav", "audio", "transcriptions/test_audio.json"),
+    ("audio/test_audio.WAVE", "wav", "audio", "transcriptions/test_audio.json"),
+    ("videos/test_video.webm", "webm", "video", "transcriptions/test_video.json"),
+    ("uploads/test_file.xyz", "xyz", "audio", "transcriptions/test_file.json"),
+])
+def test_process_media(service, key, media_format, media_type, output_key):
+    service._wait_for_transcription = MagicMock(return_value=_WAIT_RESULT)
+
+    assert service.process_media('test-bucket', key) == output_key
+
+    # Snapshot each mock's call once, then compare plain tuples and dicts
+    start_job = service.transcribe_client.start_transcription_job
+    upload = service.s3_utils.upload_json
+    assert (start_job.call_count, upload.call_count) == (1, 1)
+    assert start_job.call_args.kwargs == {
+        'TranscriptionJobName': 'transcribe-test-uuid',
+        'Media': {'MediaFileUri': f's3://test-bucket/{key}'},
+        'MediaFormat': media_format,
+        'LanguageCode': 'en-US',
+        'OutputBucketName': 'test-output-bucket',
+        'OutputKey': 'raw_transcriptions/transcribe-test-uuid.json'
+    }
+    assert upload.call_args.args == (
+        'test-output-bucket', output_key, _expected(key, _TRANSCRIPTION_TEXT, media_type)
+    )
+
+
+def test_process_media_without_segments(service):
+    service._wait_for_transcription = MagicMock(return_value=("No segments", [], []))
+
+    service.process_media('test-bucket', 'audio/test_audio.mp3')
+
+    service.s3_utils.upload_json.assert_called_once_with(
+        'test-output-bucket', 'transcriptions/test_audio.json',
+        _expected('audio/test_audio.mp3', "No segments", 'audio', segments=[], audio_segments=[])
+    )
+
+
+def test_process_media_compressed_output(service):
+    service.compress_output = True
+    service._wait_for_transcription = MagicMock(return_value=_WAIT_RESULT)
+
+    assert service.process_media('test-bucket', 'audio/test_audio.mp3') == 'transcriptions/test_audio.json.gz'
+
+    service.s3_utils.upload_json.assert_not_called()
+    service.s3_utils.upload_json_gzip.assert_called_once_with(
+        'test-output-bucket', 'transcriptions/test_audio.json.gz',
+        _expected('audio/test_audio.mp3', _TRANSCRIPTION_TEXT, 'audio')
+    )
+
+
+def test_start_and_finalize_transcription(service):
+    service.strategy = MagicMock()
+    service.strategy.process_transcription.return_value = _WAIT_RESULT
+
+    job_name, media_type = service.start_transcription_job('test-bucket', 'videos/test_video.mp4')
+    output_key = service.finalize_transcription('videos/test_video.mp4', job_name, media_type)
+
+    assert (job_name, media_type, output_key) == ('transcribe-test-uuid', 'video', 'transcriptions/test_video.json')
+    service.transcribe_client.get_transcription_job.assert_not_called()
+    service.strategy.process_transcription.assert_called_once_with(
+        'transcribe-test-uuid', 'test-output-bucket', service.s3_utils, include_segments=True
+    )
+    service.s3_utils.upload_json.assert_called_once_with(
+        'test-output-bucket', output_key, _expected('videos/test_video.mp4', _TRANSCRIPTION_TEXT, 'video')
+    )
+
+
+@pytest.mark.parametrize("default,override,expected", [
+    (True, None, True),
+    (True, False, False),
+    (False, True, True),
+])
+def test_finalize_transcription_include_segments(service, default, override, expected):
+    service.include_segments = default
+    service.strategy = MagicMock()
+    service.strategy.process_transcription.return_value = _WAIT_RESULT
+
+    service.finalize_transcription('audio/test_audio.mp3', 'transcribe-test-uuid', 'audio', include_segments=override)
+
+    service.strategy.process_transcription.assert_called_once_with(
+        'transcribe-test-uuid', 'test-output-bucket', service.s3_utils, include_segments=expected
+    )
+
+
+def test_process_media_cache_hit(service):
+    service.s3_utils.get_object_etag.return_value = 'abc123'
+    service.s3_utils.object_exists.return_value = True
+    service.s3_utils.download_json.return_value = {
+        **_expected('old/other_name.mp3', _TRANSCRIPTION_TEXT, 'audio'), 'timestamp': '2023-01-01T00:00:00'
+    }
+
+    assert service.process_media('test-bucket', 'audio/test_audio.mp3') == 'transcriptions/test_audio.json'
+
+    service.transcribe_client.start_transcription_job.assert_not_called()
+    service.s3_utils.object_exists.assert_called_once_with('test-output-bucket', 'transcriptions_cache/abc123_en-US.json')
+    service.s3_utils.upload_json.assert_called_once_with(
+        'test-output-bucket', 'transcriptions/test_audio.json',
+        _expected('audio/test_audio.mp3', _TRANSCRIPTION_TEXT, 'audio')
+    )
+    service.s3_utils.copy_object.assert_not_called()
+
+
+def test_process_media_cache_miss_stores_result(service):
+    service.s3_utils.get_object_etag.return_value = 'abc123'
+    service.s3_utils.object_exists.return_value = False
+    service._wait_for_transcription = MagicMock(return_value=_WAIT_RESULT)
+
+    assert service.process_media('test-bucket', 'audio/test_audio.mp3') == 'transcriptions/test_audio.json'
+
+    service.transcribe_client.start_transcription_job.assert_called_once()
+    service.s3_utils.copy_object.assert_called_once_with(
+        'test-output-bucket', 'transcriptions/test_audio.json',
+        'test-output-bucket', 'transcriptions_cache/abc123_en-US.json'
+    )
+
+
+def test_process_media_uses_given_etag(service):
+    service.s3_utils.object_exists.return_value = False
+    service._wait_for_transcription = MagicMock(return_value=_WAIT_RESULT)
+
+    service.process_media('test-bucket', 'audio/test_audio.mp3', etag='abc123')
+
+    service.s3_utils.get_object_etag.assert_not_called()
+    service.s3_utils.object_exists.assert_called_once_with('test-output-bucket', 'transcriptions_cache/abc123_en-US.json')
+
+
+def test_process_media_cache_disabled(service):
+    service.use_cache = False
+    service._wait_for_transcription = MagicMock(return_value=_WAIT_RESULT)
+
+    assert service.process_media('test-bucket', 'audio/test_audio.mp3', etag='abc123') == 'transcriptions/test_audio.json'
+
+    service.transcribe_client.start_transcription_job.assert_called_once()
+    service.s3_utils.get_object_etag.assert_not_called()
+    service.s3_utils.object_exists.assert_not_called()
+    service.s3_utils.copy_object.assert_not_called()
+
+
+def test_process_media_cache_lookup_error_is_a_miss(service):
+    service.s3_utils.object_exists.side_effect = ClientError({'Error': {'Code': '503'}}, 'HeadObject')
+    service._wait_for_transcription = MagicMock(return_value=_WAIT_RESULT)
+
+    assert service.process_media('test-bucket', 'audio/test_audio.mp3', etag='abc123') == 'transcriptions/test_audio.json'
+
+    service.transcribe_client.start_transcription_job.assert_called_once()
+
+
+def test_process_media_cache_copy_error_keeps_result(service):
+    service.s3_utils.object_exists.return_value = False
+    service.s3_utils.copy_object.side_effect = ClientError({'Error': {'Code': 'AccessDenied'}}, 'CopyObject')
+    service._wait_for_transcription = MagicMock(return_value=_WAIT_RESULT)
+
+    assert service.process_media('test-bucket', 'audio/test_audio.mp3', etag='abc123') == 'transcriptions/test_audio.json'
+
+    service.s3_utils.upload_json.assert_called_once()
+
+
+@pytest.mark.parametrize("default,override,expected", [
+    (True, None, True),
+    (False, None, False),
+    (False, True, True),
+])
+def test_process_media_include_segments(service, default, override, expected):
+    service.include_segments = default
+    service._wait_for_transcription = MagicMock(return_value=_WAIT_RESULT)
+
+    service.process_media('test-bucket', 'audio/test_audio.mp3', include_segments=override)
+
+    service._wait_for_transcription.assert_called_once_with(
+        'transcribe-test-uuid', timeout_seconds=None, include_segments=expected
+    )
+
+
+def test_process_media_start_job_error(service):
+    service.transcribe_client.start_transcription_job.side_effect = Exception("Transcribe unavailable")
+
+    with pytest.raises(Exception, match="Transcribe unavailable"):
+        service.process_media('test-bucket', 'audio/test_audio.mp3')
+
+    service.s3_utils.upload_json.assert_not_called()
+
+
+def test_wait_for_transcription_completed(service, sleeps):
+    service.transcribe_client.get_transcription_job.side_effect = [
+        {'TranscriptionJob': {'TranscriptionJobStatus': 'IN_PROGRESS'}},
+        {'TranscriptionJob': {'TranscriptionJobStatus': 'COMPLETED'}}
+    ]
+    service.strategy = MagicMock()
+    service.strategy.process_transcription.return_value = ("Hello", [], [])
+
+    result = service._wait_for_transcription('job-1')
+
+    assert result == ("Hello", [], [])
+    service.strategy.process_transcription.assert_called_once_with(
+        'job-1', 'test-output-bucket', service.s3_utils, include_segments=True
+    )
+    assert sleeps == [0.5]
+
+
+def test_wait_for_transcription_default_timeout(service, sleeps):
+    service.transcribe_client.get_transcription_job.return_value = {
+        'TranscriptionJob': {'TranscriptionJobStatus': 'IN_PROGRESS'}
+    }
+
+    with pytest.raises(Exception, match="timed out after 240 seconds"):
+        service._wait_for_transcription('job-1')
+
+    assert sum(sleeps) == pytest.approx(240)
+
+
+def test_wait_for_transcription_failed(service):
+    service.transcribe_client.get_transcription_job.return_value = {
+        'TranscriptionJob': {'TranscriptionJobStatus': 'FAILED', 'FailureReason': 'Unsupported media'}
+    }
+
+    with pytest.raises(Exception, match="Transcription job failed: Unsupported media"):
+        service._wait_for_transcription('job-1')
+
+
+def test_wait_for_transcription_timeout(service, sleeps):
+    service.transcribe_client.get_transcription_job.return_value = {
+        'TranscriptionJob': {'TranscriptionJobStatus': 'IN_PROGRESS'}
+    }
+
+    with pytest.raises(Exception, match="timed out"):
+        service._wait_for_transcription('job-1', timeout_seconds=3)
+
+    # Delays grow by 1.7x from 0.5s and the last one is cut short at the deadline
+    assert sleeps == pytest.approx([0.5, 0.85, 1.445, 0.205])
+    assert service.transcribe_client.get_transcription_job.call_count == 5
+
+
+@pytest.mark.parametrize("key,expected", [
+    ("audio/talk.mp3", ("talk", "mp3")),
+    ("archive.2024/talk", ("talk", "")),
+    ("audio/talk.final.wav", ("talk.final", "wav")),
+    ("audio/.mp3", (".mp3", "")),
+    ("talk.", ("talk", "")),
+])
+def test_split_key(key, expected):
+    assert _split_key(key) == expected
+
+
+@pytest.mark.parametrize("include_segments", [True, False])
+def test_aws_strategy_process_transcription(include_segments):
+    s3_utils = MagicMock(spec=S3Utils)
+    s3_utils.download_json.return_value = {
+        'results': {
+            'transcripts': [{'transcript': 'Hello world.'}],
+            'items': [
+                {'type': 'pronunciation', 'start_time': '0.0', 'end_time': '0.4',
+                 'alternatives': [{'content': 'Hello', 'confidence': '0.99'}]},
+                {'type': 'pronunciation', 'start_time': '0.5', 'end_time': '0.9',
+                 'alternatives': [{'content': 'world', 'confidence': '0.98'}]},
+                {'type': 'punctuation', 'alternatives': [{'content': '.', 'confidence': '0.0'}]}
+            ],
+            'audio_segments': [
+                {'id': 0, 'transcript': 'Hello world.', 'start_time': '0.0', 'end_time': '0.9',
+                 'items': [0, 1, 2], 'speaker_label': 'spk_0'}
+            ]
+        }
+    }
+
+    text, segments, audio_segments = AWSTranscribeStrategy().process_transcription(
+        'job-1', 'test-output-bucket', s3_utils, include_segments=include_segments
+    )
+
+    s3_utils.download_json.assert_called_once_with('test-output-bucket', 'raw_transcriptions/job-1.json')
+    assert text == 'Hello world.'
+    assert segments == ([
+        {'type': 'pronunciation', 'content': 'Hello', 'start_time': '0.0', 'end_time': '0.4', 'confidence': '0.99'},
+        {'type': 'pronunciation', 'content': 'world', 'start_time': '0.5', 'end_time': '0.9', 'confidence': '0.98'},
+        {'type': 'punctuation', 'content': '.', 'start_time': None, 'end_time': None, 'confidence': '0.0'}
+    ] if include_segments else [])
+    # Sentence-level segments feed chunking and are always kept
+    assert audio_segments == [
+        {'id': 0, 'transcript': 'Hello world.', 'start_time': '0.0', 'end_time': '0.9', 'items': [0, 1, 2]}
+    ]
@@ -22,9 +22,15 @@ import os
 import sys
 import time
 import json
+import random
 import uuid
 import argparse
+import functools
+import gzip
 import boto3
+from concurrent.futures import ThreadPoolExecutor
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
 import re
@@ -40,6 +46,39 @@ YELLOW = "\033[0;33m"
 BOLD = "\033[1m"
 NO_COLOR = "\033[0m"
 
+# Upload sample media in 16 MB parts over parallel connections
+UPLOAD_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True
+)
+
+# Keep more pooled connections than upload threads so parallel parts reuse
+# connections instead of opening new ones; adaptive retries absorb S3 503 SlowDown
+CLIENT_CONFIG = Config(
+    max_pool_connections=50,
+    retries={'max_attempts': 10, 'mode': 'adaptive'}
+)
+
+
+# Log lines the chunking Lambda writes when it is invoked and when it has loaded the
+# transcription's audio segments; used both in the server-side filter and when
+# checking the returned events
+CHUNKING_INVOKED_MARKER = "Inside the Chunking Module"
+CHUNKS_LOADED_MARKER = "Successfully loaded"
+
+
+@functools.lru_cache(maxsize=None)
+def get_client(service_name):
+    """Return a boto3 client for the service, created once and shared by every check."""
+    return boto3.client(service_name, config=CLIENT_CONFIG)
+
+
+def backoff_delay(attempt, base=1, cap=15):
+    """Return the delay before the next poll: exponential from base up to cap, with jitter."""
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
 
 def print_success(message):
     """Print a success message."""
@@ -112,7 +151,8 @@ def upload_file(file_path, bucket, s3_client, test_id):
             unique_file_name,
             ExtraArgs={
                 'Metadata': metadata
-            }
+            },
+            Config=UPLOAD_CONFIG
         )
         print_success(f"File uploaded successfully to s3://{bucket}/{unique_file_name}")
         return unique_file_name
@@ -121,6 +161,28 @@ def upload_file(file_path, bucket, s3_client, test_id):
         sys.exit(1)
 
 
+def object_exists(bucket, key, s3_client):
+    """Return whether the object exists, using a HEAD request."""
+    try:
+        s3_client.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+
+def find_test_object(bucket, prefix, s3_client, matches):
+    """Return the first key under the prefix accepted by the matches predicate, or None."""
+    # Page through the listing so matches beyond the first 1000 keys are not missed
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': 1000}):
+        for obj in page.get('Contents', []):
+            if matches(obj['Key']):
+                return obj['Key']
+    return None
+
+
 def wait_for_transcription(bucket, input_key, s3_client, timeout, test_id):
     """Wait for the transcription to appear in the output bucket."""
     print_header("Waiting for transcription to complete...")
@@ -129,41 +191,32 @@ def wait_for_transcription(bucket, input_key, s3_client, timeout, test_id):
     file_name = os.path.basename(input_key)
     base_name, _ = os.path.splitext(file_name)
     
-    # The expected output should contain the same test_id
-    expected_prefix = f"transcriptions/{base_name}"
+    # The transcription service writes transcriptions/<input base name>.json.gz, or
+    # .json when compression is disabled, and the base name already carries the
+    # test_id, so both candidate keys can be checked directly
+    expected_keys = (f"transcriptions/{base_name}.json.gz", f"transcriptions/{base_name}.json")
     
-    max_attempts = 10
-    wait_time = timeout // max_attempts  # Distribute timeout across attempts
-    attempt = 1
+    print_info(f"Waiting up to {timeout} seconds for s3://{bucket}/{expected_keys[0]} (or .json)...")
     
-    while attempt <= max_attempts:
-        print_info(f"Attempt {attempt} of {max_attempts}: Checking for transcription...")
-        
+    deadline = time.time() + timeout
+    attempt = 0
+    while True:
         try:
-            response = s3_client.list_objects_v2(
-                Bucket=bucket,
-                Prefix=f"transcriptions/"
-            )
-            
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    # Only consider JSON files that match our test_id
-                    if (obj['Key'].endswith('.json') and 
-                        test_id in obj['Key'] and
-                        base_name.split('_')[0] in obj['Key']):
-                        print_success(f"Found transcription: {obj['Key']}")
-                        return obj['Key']
-            
-            if attempt < max_attempts:
-                print_info(f"Transcription not ready yet. Waiting {wait_time} seconds before next attempt...")
-                time.sleep(wait_time)
-            attempt += 1
-        
+            for key in expected_keys:
+                if object_exists(bucket, key, s3_client):
+                    print_success(f"Found transcription: {key}")
+                    return key
         except ClientError as e:
             print_error(f"Failed to check for transcription: {e}")
             sys.exit(1)
+        
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        time.sleep(min(backoff_delay(attempt), remaining))
+        attempt += 1
     
-    print_error(f"Transcription did not complete after {max_attempts} attempts ({timeout} seconds total)")
+    print_error(f"Transcription did not complete within {timeout} seconds")
     print_error("Please check the following:")
     print_error("1. The input file was successfully uploaded")
     print_error("2. The transcription Lambda function was triggered")
@@ -179,9 +232,13 @@ def verify_transcription(bucket, key, s3_client):
     try:
         # Download the transcription file
         response = s3_client.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
+        content = response['Body'].read()
+        
+        # Transcriptions are stored gzip-compressed by default
+        if response.get('ContentEncoding') == 'gzip':
+            content = gzip.decompress(content)
         
-        # Parse the JSON content
+        # Parse the JSON content straight from bytes, without a decoded copy
         transcription = json.loads(content)
         
         # Basic validation for the custom format
@@ -228,28 +285,38 @@ def wait_for_chunking_output(bucket, transcription_key, s3_client, timeout, test
     print_info(f"Looking for chunking outputs with prefix: {expected_prefix}")
     
     start_time = time.time()
-    while (time.time() - start_time) < timeout:
+    deadline = start_time + timeout
+    attempt = 0
+    last_report = None
+    while True:
         # List objects with the expected prefix
         try:
-            response = s3_client.list_objects_v2(
-                Bucket=bucket,
-                Prefix="chunks/"
+            # Only consider JSON files that match our test_id pattern
+            key = find_test_object(
+                bucket, "chunks/", s3_client,
+                lambda key: key.endswith('.json') and test_id in key
             )
-            
-            if 'Contents' in response:
-                for obj in response['Contents']:
-                    # Only consider JSON files that match our test_id pattern
-                    if (obj['Key'].endswith('.json') and 
-                        test_id in obj['Key']):
-                        print_success(f"Found chunking output: {obj['Key']}")
-                        return obj['Key']
-            
-            print_info(f"Chunking output not ready yet, waiting 10 seconds... ({int(time.time() - start_time)}s elapsed)")
-            time.sleep(10)
+            if key:
+                print_success(f"Found chunking output: {key}")
+                return key
         
         except ClientError as e:
             print_error(f"Failed to check for chunking output: {e}")
             sys.exit(1)
+        
+        now = time.time()
+        remaining = deadline - now
+        if remaining <= 0:
+            break
+        
+        # Report progress at most every 30 seconds rather than on every poll
+        if last_report is None or now - last_report >= 30:
+            last_report = now
+            print_info(f"Chunking output not ready yet, still polling... ({int(now - start_time)}s elapsed)")
+        
+        # Poll quickly at first, since chunking usually finishes soon after transcription
+        time.sleep(min(backoff_delay(attempt), remaining))
+        attempt += 1
     
     print_error(f"Timeout after {timeout} seconds waiting for chunking output")
     return None
@@ -260,8 +327,8 @@ def check_step_functions_execution(media_key, test_id):
     print_header("Checking for Step Functions execution...")
     
     try:
-        # Create a Step Functions client
-        sfn_client = boto3.client('stepfunctions')
+        # Get the shared Step Functions client
+        sfn_client = get_client('stepfunctions')
         
         # List recent executions of the video processing state machine
         # First, we need to find the state machine ARN
@@ -338,8 +405,8 @@ def check_cloudwatch_logs_for_chunking(test_id, timeout=60):
     print_header("Checking CloudWatch logs for chunking module invocation...")
     
     try:
-        # Create a CloudWatch logs client
-        logs_client = boto3.client('logs')
+        # Get the shared CloudWatch logs client
+        logs_client = get_client('logs')
         
         # Calculate the time range to search for logs
         end_time = datetime.now()
@@ -372,31 +439,25 @@ def check_cloudwatch_logs_for_chunking(test_id, timeout=60):
                 
             print_info(f"Checking log group: {log_group_name}")
             
-            # Get the log streams for this log group, sorted by most recent first
-            streams_response = logs_client.describe_log_streams(
-                logGroupName=log_group_name,
-                orderBy='LastEventTime',
-                descending=True,
-                limit=5  # Limit to most recent streams
-            )
-            
-            for stream in streams_response.get('logStreams', []):
-                # Get the logs from this stream within our time window
-                try:
-                    logs_response = logs_client.get_log_events(
-                        logGroupName=log_group_name,
-                        logStreamName=stream['logStreamName'],
-                        startTime=start_time_ms,
-                        endTime=end_time_ms,
-                        limit=100  # Get a reasonable number of log events
-                    )
-                    
+            # Let CloudWatch filter the events across every stream in the window,
+            # instead of listing streams and reading each one back in full
+            try:
+                paginator = logs_client.get_paginator('filter_log_events')
+                pages = paginator.paginate(
+                    logGroupName=log_group_name,
+                    startTime=start_time_ms,
+                    endTime=end_time_ms,
+                    # Substring regex built from the same strings the loop below checks for
+                    filterPattern=f'%{CHUNKING_INVOKED_MARKER}|{CHUNKS_LOADED_MARKER}|{test_id}%'
+                )
+                
+                for page in pages:
                     # Check if any log messages indicate the chunking module was invoked
-                    for event in logs_response.get('events', []):
+                    for event in page.get('events', []):
                         message = event.get('message', '')
                         
                         # Look for evidence of chunking module invocation
-                        if 'Hello World from Chunking Module!' in message:
+                        if CHUNKING_INVOKED_MARKER in message:
                             print_success("Found evidence of chunking module invocation!")
                             chunking_found = True
                         
@@ -406,7 +467,7 @@ def check_cloudwatch_logs_for_chunking(test_id, timeout=60):
                             chunking_found = True
                         
                         # Look for specific evidence of chunk processing
-                        if ('Processed' in message and 'audio segments' in message):
+                        if CHUNKS_LOADED_MARKER in message and 'audio segments' in message:
                             print_success(f"Found logs indicating chunks were processed: {message}")
                             processed_chunks = True
                             
@@ -418,10 +479,10 @@ def check_cloudwatch_logs_for_chunking(test_id, timeout=60):
                         print_success("Confirmed chunking module was invoked AND processed chunks!")
                         return True
                         
-                    if chunking_found:
-                        print_info("Chunking module was invoked, but no evidence of chunk processing")
-                except Exception as e:
-                    print_info(f"Error retrieving logs from stream {stream['logStreamName']}: {e}")
+                if chunking_found:
+                    print_info("Chunking module was invoked, but no evidence of chunk processing")
+            except Exception as e:
+                print_info(f"Error retrieving logs from log group {log_group_name}: {e}")
         
         if chunking_found:
             # Even if we didn't see chunk processing, at least the module was invoked
@@ -456,46 +517,61 @@ def verify_chunking(transcription, output_bucket, input_key, s3_client, timeout,
     return True
 
 
-def cleanup_test_files(input_bucket, output_bucket, test_id, s3_client):
+def delete_test_objects(bucket, prefix, test_id, s3_client, label):
+    """Delete every object under the prefix whose key contains the test ID (or all of them when test_id is None), in batches."""
+    keys = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': 1000}):
+        for obj in page.get('Contents', []):
+            if test_id is None or test_id in obj['Key']:
+                print_info(f"Deleting {label}: {obj['Key']}")
+                keys.append(obj['Key'])
+    
+    # delete_objects accepts at most 1000 keys per request
+    for i in range(0, len(keys), 1000):
+        response = s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in keys[i:i + 1000]], 'Quiet': True}
+        )
+        for error in response.get('Errors', []):
+            print_error(f"Failed to delete {error.get('Key')}: {error.get('Message')}")
+
+
+def cleanup_test_files(input_bucket, output_bucket, input_key, test_id, s3_client):
     """Clean up any files created during the test."""
     print_header(f"Cleaning up test files with ID {test_id}...")
     
+    # Input and transcription keys start with the uploaded base name, which ends
+    # with the test ID, so S3 only has to list this test's objects
+    base_name, _ = os.path.splitext(os.path.basename(input_key))
+    
+    targets = [
+        # Input files
+        (input_bucket, f"media/{base_name}", test_id, "input file"),
+        # Output files
+        (output_bucket, f"transcriptions/{base_name}", test_id, "output file"),
+        # Chunking outputs, if they exist
+        (output_bucket, "chunks/", test_id, "chunk file"),
+    ]
+    
     try:
-        # Find and delete input files
-        response = s3_client.list_objects_v2(
-            Bucket=input_bucket,
-            Prefix="media/"
-        )
-        
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                if test_id in obj['Key']:
-                    print_info(f"Deleting input file: {obj['Key']}")
-                    s3_client.delete_object(Bucket=input_bucket, Key=obj['Key'])
-        
-        # Find and delete output files
-        response = s3_client.list_objects_v2(
-            Bucket=output_bucket,
-            Prefix="transcriptions/"
-        )
-        
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                if test_id in obj['Key']:
-                    print_info(f"Deleting output file: {obj['Key']}")
-                    s3_client.delete_object(Bucket=output_bucket, Key=obj['Key'])
-        
-        # Clean up chunking outputs if they exist
-        response = s3_client.list_objects_v2(
-            Bucket=output_bucket,
-            Prefix="chunks/"
-        )
-        
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                if test_id in obj['Key']:
-                    print_info(f"Deleting chunk file: {obj['Key']}")
-                    s3_client.delete_object(Bucket=output_bucket, Key=obj['Key'])
+        # Cached results are keyed by the uploaded content's ETag rather than the test ID,
+        # so read it before the input file is deleted
+        etag = s3_client.head_object(Bucket=input_bucket, Key=input_key)['ETag'].strip('"')
+        targets.append((output_bucket, f"transcriptions_cache/{etag}_", None, "cached result"))
+    except ClientError as e:
+        print_info(f"Could not read the input file's ETag, leaving cached results in place: {e}")
+    
+    try:
+        # The prefixes are independent, so list and delete them concurrently;
+        # boto3 clients are safe to share between threads
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            futures = [
+                executor.submit(delete_test_objects, bucket, prefix, key_filter, s3_client, label)
+                for bucket, prefix, key_filter, label in targets
+            ]
+            for future in futures:
+                future.result()
         
         print_success("Cleanup completed")
     
@@ -513,10 +589,7 @@ class EmbeddingResult:
 
 def check_embedding_processing(test_id: str, expected_transcript: str, timeout: int = 300) -> bool:
     """Check if the embedding processing completed successfully by monitoring Step Functions execution."""
-    max_attempts = 10
-    wait_time = timeout // max_attempts
-    
-    sfn_client = boto3.client('stepfunctions')
+    sfn_client = get_client('stepfunctions')
     
     # Find the state machine ARN
     response = sfn_client.list_state_machines()
@@ -531,8 +604,11 @@ def check_embedding_processing(test_id: str, expected_transcript: str, timeout:
         print_error("Could not find the video processing state machine")
         return False
     
-    # Check executions until we find success or timeout
-    for attempt in range(max_attempts):
+    # Check executions until we find success or timeout, polling quickly at first
+    deadline = time.time() + timeout
+    attempt = 0
+    found = False
+    while True:
         response = sfn_client.list_executions(
             stateMachineArn=state_machine_arn,
             maxResults=10
@@ -546,6 +622,7 @@ def check_embedding_processing(test_id: str, expected_transcript: str, timeout:
             try:
                 input_data = json.loads(exec_details.get('input', '{}'))
                 if test_id in str(input_data):
+                    found = True
                     status = exec_details.get('status')
                     
                     if status == 'SUCCEEDED':
@@ -559,18 +636,21 @@ def check_embedding_processing(test_id: str, expected_transcript: str, timeout:
                             print_error(f"Cause: {exec_details.get('cause')}")
                         return False
                     elif status == 'RUNNING':
-                        print_info(f"Step Functions execution still running. Waiting {wait_time} seconds before next attempt...")
-                        time.sleep(wait_time)
+                        print_info(f"Step Functions execution still running. Waiting before next attempt... (attempt {attempt + 1})")
                         break
             except json.JSONDecodeError:
                 continue
         
-        if attempt == max_attempts - 1:
-            print_error("Embedding processing did not complete within the timeout period")
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            if found:
+                print_error("Embedding processing did not complete within the timeout period")
+            else:
+                print_error("Could not find matching Step Functions execution")
             return False
-    
-    print_error("Could not find matching Step Functions execution")
-    return False
+        
+        time.sleep(min(backoff_delay(attempt), remaining))
+        attempt += 1
 
 
 def get_terraform_output(output_name):
@@ -620,7 +700,7 @@ def get_secrets() -> Dict[str, str]:
     """Get secrets from AWS Secrets Manager."""
     try:
         # Get secrets client
-        secrets_client = boto3.client('secretsmanager')
+        secrets_client = get_client('secretsmanager')
         
         # Get the API key from Secrets Manager
         secret_response = secrets_client.get_secret_value(
@@ -710,7 +790,7 @@ def main():
     print_header("\n=== Starting Video Pipeline E2E Test ===\n")
     
     # Initialize AWS client
-    s3_client = boto3.client('s3')
+    s3_client = get_client('s3')
     
     # Generate a unique test ID
     test_id = str(uuid.uuid4())[:8]
@@ -748,7 +828,7 @@ def main():
         
         # Clean up if requested
         if args.cleanup:
-            cleanup_test_files(args.input_bucket, args.output_bucket, test_id, s3_client)
+            cleanup_test_files(args.input_bucket, args.output_bucket, input_key, test_id, s3_client)
             
     except KeyboardInterrupt:
         print_info("\nTest interrupted by user")